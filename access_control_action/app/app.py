@@ -1,17 +1,1023 @@
 """This module contains the render function for the access control action app."""
 
+import html
+import io
 import json
-import time
-from contextlib import suppress
-from typing import Any
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, Callable, Protocol, TypeVar
 
 import pandas as pd
 import streamlit as st
-import yaml
 from jvclient.lib.utils import call_api, get_reports_payload
 from jvclient.lib.widgets import app_controls, app_header, app_update_action
+from requests import Response
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from streamlit_router import StreamlitRouter
 
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the stdlib json
+    orjson = None  # type: ignore[assignment]
+
+# group member row, filled with the background color and the escaped user ID
+_USER_ROW_TMPL = (
+    '<div style="padding: 10px 14px; background-color: %s; border-radius: 8px; '
+    'margin-bottom: 6px; border: 1px solid #3c3c3c;">'
+    '<strong style="color: #817D7D; font-size: 15px;">%s</strong></div>'
+)
+# alternating member row background colors
+_USER_ROW_COLORS = ("#1f1f23", "#2a2a2f")
+
+_T = TypeVar("_T")
+_I = TypeVar("_I")
+
+# cached walker results kept per fetch helper, across all sessions
+_CACHE_MAX_ENTRIES = 256
+
+# cached permission pages, one per session, filter and page viewed, so kept
+# to a tighter bound than the other walker results
+_PAGE_CACHE_MAX_ENTRIES = 64
+
+# upper bound on walker calls in flight at once from a single rerun
+_MAX_CONCURRENT_CALLS = 8
+
+# rows per page offered for the permissions table
+_PAGE_SIZES = [25, 50, 100, 250]
+
+# exports larger than this many bytes are not previewed inline
+_EXPORT_PREVIEW_LIMIT = 8192
+
+
+def _dump_json(data: object) -> bytes:
+    """
+    Serialize data as indented JSON.
+
+    Args:
+        data (object): The data to serialize.
+
+    Returns:
+        bytes: The UTF-8 encoded JSON document.
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2).encode("utf-8")
+
+
+def _load_json(data: bytes | str) -> object:
+    """
+    Parse a JSON document.
+
+    Args:
+        data (bytes | str): The JSON document.
+
+    Returns:
+        object: The parsed data.
+
+    Raises:
+        json.JSONDecodeError: If the document is not valid JSON.
+    """
+    if orjson is not None:
+        # orjson.JSONDecodeError subclasses json.JSONDecodeError
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _load_yaml(stream: str | IO[str]) -> object:
+    """
+    Parse a YAML document with the fastest available safe loader.
+
+    Args:
+        stream (str | IO[str]): The YAML document, as a string or a text stream.
+
+    Returns:
+        object: The parsed data.
+    """
+    # only the import path needs yaml, so it is not loaded with the page
+    import yaml
+
+    # CSafeLoader is missing when PyYAML is built without libyaml
+    return yaml.load(stream, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+
+
+class _Clearable(Protocol):
+    """A cached fetch helper whose results can be dropped."""
+
+    def clear(self) -> None:
+        """Drop every cached result."""
+
+
+class _WalkerError(Exception):
+    """Raised when an access control walker call does not succeed."""
+
+    def __init__(self, walker: str, status_code: int | None) -> None:
+        """
+        Initialize the error.
+
+        Args:
+            walker (str): The name of the walker that was called.
+            status_code (int | None): The response status code, or None if
+                no response was received.
+        """
+        super().__init__(walker, status_code)
+        self.walker = walker
+        self.status_code = status_code
+
+    def __str__(self) -> str:
+        """Describe the failed call."""
+        return f"{self.walker} failed with status {self.status_code}"
+
+
+def _call_walker(walker: str, json_data: dict) -> Response:
+    """
+    Call an access control walker.
+
+    Args:
+        walker (str): The name of the walker to call.
+        json_data (dict): The payload to send to the walker.
+
+    Returns:
+        Response: The successful response, its reports are read with
+            get_reports_payload.
+
+    Raises:
+        _WalkerError: If the call failed or did not return a 200 response.
+    """
+    result = call_api(
+        endpoint=f"action/walker/access_control_action/{walker}",
+        json_data=json_data,
+    )
+    status_code = getattr(result, "status_code", None)
+    if status_code != 200:
+        raise _WalkerError(walker, status_code)
+    return result
+
+
+def _session_id() -> str:
+    """
+    Get the ID of the browser session running the script.
+
+    Returns:
+        str: The session ID, or an empty string outside a script run.
+    """
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else ""
+
+
+def _read(fetcher: Callable[..., _T], *args: object) -> _T | None:
+    """
+    Read through a cached fetch helper for the current session.
+
+    Args:
+        fetcher (Callable[..., _T]): The cached fetch helper, taking the
+            session ID ahead of its own arguments.
+        *args (object): The arguments of the fetch helper.
+
+    Returns:
+        _T | None: The fetched value, or None if the walker call failed.
+    """
+    try:
+        # walker calls carry the session's credentials, so cached results
+        # are keyed by session rather than shared across the process
+        return fetcher(_session_id(), *args)
+    except _WalkerError:
+        # st.cache_data does not memoise exceptions, so the next read retries
+        return None
+
+
+@st.cache_data(ttl=30, show_spinner=False, max_entries=_CACHE_MAX_ENTRIES)
+def _fetch_users(session_id: str, agent_id: str) -> list[dict]:
+    """
+    Fetch the registered users of the agent.
+
+    Args:
+        session_id (str): The session the result is cached for, it only keys
+            the cache.
+        agent_id (str): The agent ID.
+
+    Returns:
+        list[dict]: The get_users payload, one record per user.
+    """
+    return get_reports_payload(_call_walker("get_users", {"agent_id": agent_id}))
+
+
+@st.cache_data(ttl=30, show_spinner=False, max_entries=_CACHE_MAX_ENTRIES)
+def _fetch_groups(session_id: str, agent_id: str) -> dict[str, list[str]]:
+    """
+    Fetch the groups of the agent along with their users.
+
+    Args:
+        session_id (str): The session the result is cached for, it only keys
+            the cache.
+        agent_id (str): The agent ID.
+
+    Returns:
+        dict[str, list[str]]: The user IDs of each group, keyed by group name.
+    """
+    return get_reports_payload(
+        _call_walker("get_groups", {"agent_id": agent_id, "include_users": True})
+    )
+
+
+@st.cache_data(ttl=30, show_spinner=False, max_entries=_CACHE_MAX_ENTRIES)
+def _fetch_channels(session_id: str, agent_id: str) -> list[str]:
+    """
+    Fetch the channels of the agent.
+
+    Args:
+        session_id (str): The session the result is cached for, it only keys
+            the cache.
+        agent_id (str): The agent ID.
+
+    Returns:
+        list[str]: The channel names.
+    """
+    return get_reports_payload(_call_walker("get_channels", {"agent_id": agent_id}))
+
+
+@st.cache_data(ttl=30, show_spinner=False, max_entries=_CACHE_MAX_ENTRIES)
+def _fetch_resources(session_id: str, agent_id: str) -> list[str]:
+    """
+    Fetch the resources of the agent.
+
+    Args:
+        session_id (str): The session the result is cached for, it only keys
+            the cache.
+        agent_id (str): The agent ID.
+
+    Returns:
+        list[str]: The resource names.
+    """
+    return get_reports_payload(_call_walker("get_resources", {"agent_id": agent_id}))
+
+
+@st.cache_data(ttl=30, show_spinner=False, max_entries=_PAGE_CACHE_MAX_ENTRIES)
+def _fetch_permission_page(
+    session_id: str,
+    agent_id: str,
+    limit: int,
+    offset: int,
+    resources: tuple[str, ...] = (),
+    entity_contains: str = "",
+    permission: str = "",
+) -> dict:
+    """
+    Fetch one page of the flattened permissions matching the filters.
+
+    Args:
+        session_id (str): The session the page is cached for.
+        agent_id (str): The agent ID.
+        limit (int): The maximum number of rows to fetch.
+        offset (int): The number of matching rows to skip.
+        resources (tuple[str, ...]): Only keep these resources, all if empty.
+        entity_contains (str): Only keep entities containing this text,
+            ignoring case.
+        permission (str): Only keep "Allow" or "Deny" rows, both if empty.
+
+    Returns:
+        dict: The page columns and the matching row count.
+    """
+    return get_reports_payload(
+        _call_walker(
+            "list_permissions",
+            {
+                "agent_id": agent_id,
+                "limit": limit,
+                "offset": offset,
+                "resources": list(resources),
+                "entity_contains": entity_contains,
+                "permission": permission,
+            },
+        )
+    )
+
+
+def _build_permissions_df(columns: dict[str, list]) -> pd.DataFrame:
+    """
+    Build the permissions table from list_permissions columns.
+
+    Args:
+        columns (dict[str, list]): The values of each column, one per
+            allow/deny entry.
+
+    Returns:
+        pd.DataFrame: The permissions table.
+    """
+    names = ["enabled", "channel", "resource", "permission", "entity", "type"]
+    # the payload is already column-wise, so each column is taken as a whole
+    # instead of being gathered from per-row records; low cardinality columns
+    # are stored as categories for compact frames and cheap comparisons
+    return pd.DataFrame({name: columns.get(name, []) for name in names}).astype(
+        {
+            "enabled": "bool",
+            "channel": "category",
+            "resource": "category",
+            "permission": "category",
+            "type": "category",
+        }
+    )
+
+
+@st.cache_data(ttl=30, show_spinner=False, max_entries=_CACHE_MAX_ENTRIES)
+def _fetch_entities(session_id: str, agent_id: str) -> tuple[list[str], set[str], dict]:
+    """
+    Fetch the entities permissions can be granted to.
+
+    Args:
+        session_id (str): The session the entities are cached for.
+        agent_id (str): The agent ID.
+
+    Returns:
+        tuple[list[str], set[str], dict]: The group names followed by the user
+            IDs, the set of group names and the groups with their users.
+    """
+    # failures propagate, so entities are never derived from a failed call
+    groups = _fetch_groups(session_id, agent_id) or {}
+    users = _fetch_users(session_id, agent_id)
+    return list(groups) + _user_ids(users), set(groups), groups
+
+
+def _map_concurrently(func: Callable[[_I], _T], items: list[_I]) -> list[_T]:
+    """
+    Apply a function to independent items concurrently.
+
+    Args:
+        func (Callable[[_I], _T]): The function to apply, typically one
+            issuing a walker call.
+        items (list[_I]): The items to apply the function to.
+
+    Returns:
+        list[_T]: The results, in the order the items were given.
+    """
+    if not items:
+        return []
+
+    # worker threads need the script context to reach session state and caches
+    ctx = get_script_run_ctx()
+
+    def run(item: _I) -> _T:
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return func(item)
+
+    with ThreadPoolExecutor(
+        max_workers=min(len(items), _MAX_CONCURRENT_CALLS)
+    ) as executor:
+        return list(executor.map(run, items))
+
+
+def _prefetch(agent_id: str, *fetchers: Callable[..., object]) -> None:
+    """
+    Warm cached fetch helpers for an agent concurrently.
+
+    Args:
+        agent_id (str): The agent ID passed to each fetcher.
+        *fetchers (Callable[..., object]): The cached fetch helpers to run,
+            they are then read from the cache with _read.
+    """
+    _map_concurrently(lambda fetcher: _read(fetcher, agent_id), list(fetchers))
+
+
+def _user_ids(users: list[dict] | None) -> list[str]:
+    """
+    Extract the user IDs from a get_users payload.
+
+    Args:
+        users (list[dict] | None): The get_users payload, or None if the call
+            failed.
+
+    Returns:
+        list[str]: The user IDs.
+    """
+    return [user["context"]["user_id"] for user in users or []]
+
+
+def _mutation_records(
+    rows: pd.DataFrame, op: str, user_field: str, **columns: object
+) -> list[dict]:
+    """
+    Build apply_permissions_batch mutations for permission table rows.
+
+    Args:
+        rows (pd.DataFrame): The permission rows to mutate.
+        op (str): The mutation, "enable_access" or "delete_permission".
+        user_field (str): The payload field naming the user, as it differs
+            between the two walkers.
+        **columns (object): Extra per-row payload fields.
+
+    Returns:
+        list[dict]: One mutation per row.
+    """
+    # the payloads are built column-wise and converted to records once,
+    # rather than assembled field by field for every row
+    is_group = rows["type"] == "group"
+    return (
+        rows[["channel", "resource"]]
+        .astype(str)
+        .assign(
+            op=op,
+            group=rows["entity"].where(is_group, ""),
+            **{user_field: rows["entity"].where(~is_group, "")},
+            **columns,
+        )
+        .to_dict("records")
+    )
+
+
+def _index_granted(
+    granted: dict[str, list[str]], groups: dict
+) -> tuple[dict[str, set[str]], dict[str, set[str]]]:
+    """
+    Index the entities granted access to a resource, and the group members.
+
+    Args:
+        granted (dict[str, list[str]]): The user IDs and group names granted
+            allow and deny access, keyed by access type.
+        groups (dict): The groups with their users.
+
+    Returns:
+        tuple[dict[str, set[str]], dict[str, set[str]]]: The entities granted
+            access directly and the members of the groups granted access,
+            both keyed by access type.
+    """
+    entities: dict[str, set[str]] = {}
+    members: dict[str, set[str]] = {}
+    for access_type in ("allow", "deny"):
+        entities[access_type] = set(granted.get(access_type, ()))
+        members[access_type] = set()
+        for name in entities[access_type]:
+            members[access_type].update(groups.get(name) or ())
+    return entities, members
+
+
+def _rerun_fragment() -> None:
+    """Rerun the current fragment, or the whole app outside a fragment rerun."""
+    ctx = get_script_run_ctx()
+    # fragments also run as part of full-app runs, where a fragment scoped
+    # rerun raises StreamlitInvalidLayoutContextError
+    if ctx is not None and ctx.fragment_ids_this_run:
+        st.rerun(scope="fragment")
+    st.rerun()
+
+
+def _bump_cache(*fetchers: _Clearable) -> None:
+    """
+    Invalidate cached walker results after a mutation.
+
+    Args:
+        *fetchers (_Clearable): The cached fetch helpers affected by the
+            mutation, all of them when none are given.
+    """
+    for fetcher in fetchers or (
+        _fetch_users,
+        _fetch_groups,
+        _fetch_channels,
+        _fetch_resources,
+        _fetch_permission_page,
+    ):
+        fetcher.clear()
+    # derived from users and groups, and cheap to rebuild from their caches
+    _fetch_entities.clear()
+
+
+@st.fragment
+def _users_fragment(agent_id: str, model_key: str) -> None:
+    """
+    Render the user management section.
+
+    Args:
+        agent_id (str): The agent ID.
+        model_key (str): The model key used to namespace widget keys.
+    """
+    add_tab, users_tab = st.tabs(["Add Users", "Users"])
+
+    # add user tab
+    with add_tab:
+        # Create the text input - let Streamlit manage the state with the key
+        user_id = st.text_input("Enter User ID", key=f"{model_key}_input_user_id")
+
+        if st.button(
+            "Add User", key=f"{model_key}_btn_add_user", disabled=(not agent_id)
+        ):
+            if result := call_api(
+                endpoint="action/walker/access_control_action/add_user",
+                json_data={"agent_id": agent_id, "user_id": user_id},
+            ):
+                _bump_cache()
+                st.toast("User added successfully", icon="✅")
+                st.rerun()
+            else:
+                st.toast(
+                    "Failed to add user. Ensure that the user ID is correct", icon="⚠️"
+                )
+
+    # users tab
+    with users_tab:
+
+        if (result := _read(_fetch_users, agent_id)) is not None:
+            for user_id in _user_ids(result):
+                with st.container(border=True):
+                    cols = st.columns([4, 1])
+                    with cols[0]:
+                        st.markdown(f"**{user_id}**")
+
+                    with cols[1]:
+                        if st.button(
+                            "Delete",
+                            key=f"{model_key}_{user_id}_btn_delete_user",
+                            disabled=(not agent_id),
+                            use_container_width=True,
+                        ):
+                            if result := call_api(
+                                endpoint="action/walker/access_control_action/delete_user",
+                                json_data={
+                                    "agent_id": agent_id,
+                                    "user_id": user_id,
+                                },
+                            ):
+                                _bump_cache()
+                                st.toast(
+                                    f"User {user_id} removed successfully", icon="✅"
+                                )
+                                st.rerun()
+                            else:
+                                st.toast(f"Failed to remove user '{user_id}'", icon="⚠️")
+        else:
+            st.error("Failed to get user.")
+
+
+@st.fragment
+def _groups_fragment(agent_id: str, model_key: str) -> None:
+    """
+    Render the group management section.
+
+    Args:
+        agent_id (str): The agent ID.
+        model_key (str): The model key used to namespace widget keys.
+    """
+    add_tab, add_session_group_tab, groups_tab = st.tabs(
+        ["Add Group", "Add User to Group", "Groups"]
+    )
+
+    with add_tab:
+        new_group = st.text_input("Enter Group", key=f"{model_key}_input_group")
+        if st.button("Add Group", key=f"{model_key}_btn_add_group"):
+            # Call the function to purge
+            if result := call_api(
+                endpoint="action/walker/access_control_action/add_group",
+                json_data={"agent_id": agent_id, "name": new_group},
+            ):
+                _bump_cache(_fetch_groups)
+                st.toast("Group added successfully", icon="✅")
+                st.rerun()
+            else:
+                st.toast(
+                    "Failed to add group. Ensure that the group is correct", icon="⚠️"
+                )
+
+    with add_session_group_tab:
+        groups_result = _read(_fetch_groups, agent_id) or {}
+        users = _user_ids(_read(_fetch_users, agent_id))
+        groups: list[Any] = []
+        if groups_result:
+            groups = list(groups_result.keys())
+
+        if not groups:
+            st.error("Failed to get groups.")
+
+        if not users:
+            st.error("Failed to get users.")
+
+        user_id = st.selectbox("Select User", users, key=f"{model_key}_select_user")
+        group = st.selectbox("Select Group", groups, key=f"{model_key}_select_group")
+
+        if st.button("Add User to Group", key=f"{model_key}_btn_add_session_group"):
+            # Call the function to purge
+            if result := call_api(
+                endpoint="action/walker/access_control_action/add_session_group",
+                json_data={
+                    "agent_id": agent_id,
+                    "user_id": user_id,
+                    "group": group,
+                },
+            ):
+                _bump_cache(_fetch_groups, _fetch_permission_page)
+                st.toast("Group added successfully", icon="✅")
+                _rerun_fragment()
+            else:
+                st.toast(
+                    "Failed to add group. Ensure that the group is correct", icon="⚠️"
+                )
+
+    with groups_tab:
+
+        for group_name in groups_result:
+            users = groups_result[group_name]
+            if group_name not in ["all", "any"]:
+
+                # Group header row
+                group_cols = st.columns([6, 1])
+                with group_cols[0]:
+                    st.markdown(f"### {group_name}")
+                with group_cols[1]:
+                    if st.button(
+                        "Delete Group",
+                        key=f"{model_key}_{group_name}_btn_delete_group",
+                        disabled=(not agent_id),
+                        use_container_width=True,
+                    ):
+                        result = call_api(
+                            endpoint="action/walker/access_control_action/delete_group",
+                            json_data={"agent_id": agent_id, "name": group_name},
+                        )
+                        if result:
+                            _bump_cache()
+                            st.toast(
+                                f"Group {group_name} removed successfully", icon="✅"
+                            )
+                            st.rerun()
+                        else:
+                            st.toast(f"Failed to remove group '{group_name}'", icon="⚠️")
+
+                # Show users under group
+                if users:
+                    # one markdown block per group rather than one per user,
+                    # user IDs are escaped as they are rendered as HTML
+                    rows = "".join(
+                        _USER_ROW_TMPL
+                        % (_USER_ROW_COLORS[i % 2], html.escape(str(user)))
+                        for i, user in enumerate(users)
+                    )
+                    st.markdown(rows, unsafe_allow_html=True)
+
+                    user_cols = st.columns([6, 1])
+                    with user_cols[0]:
+                        user = st.selectbox(
+                            "Remove user",
+                            users,
+                            key=f"{model_key}_{group_name}_select_remove_user",
+                            label_visibility="collapsed",
+                        )
+                    with user_cols[1]:
+                        if st.button(
+                            "Remove User",
+                            key=f"{model_key}_{group_name}_btn_remove_user",
+                            use_container_width=True,
+                            help=f"Remove the selected user from {group_name}",
+                        ):
+                            result = call_api(
+                                endpoint="action/walker/access_control_action/remove_user",
+                                json_data={
+                                    "agent_id": agent_id,
+                                    "group": group_name,
+                                    "user_id": user,
+                                },
+                            )
+
+                            if result:
+                                _bump_cache(
+                                    _fetch_groups,
+                                    _fetch_permission_page,
+                                )
+                                st.toast(
+                                    f"User '{user}' removed from '{group_name}'",
+                                    icon="✅",
+                                )
+                                _rerun_fragment()
+                            else:
+                                st.toast(
+                                    f"Failed to remove user '{user}' from '{group_name}'",
+                                    icon="⚠️",
+                                )
+                else:
+                    st.info("No users in this group.")
+        st.markdown("\n")
+
+
+@st.fragment
+def _manage_permissions_fragment(agent_id: str, model_key: str) -> None:
+    """
+    Render the add permission section.
+
+    Args:
+        agent_id (str): The agent ID.
+        model_key (str): The model key used to namespace widget keys.
+    """
+    st.subheader("Add Permissions")
+    # the lookups are independent, so cache misses are fetched in parallel
+    _prefetch(agent_id, _fetch_channels, _fetch_resources, _fetch_entities)
+    channels = _read(_fetch_channels, agent_id)
+    resources = _read(_fetch_resources, agent_id)
+    entities, group_names, groups_result = _read(_fetch_entities, agent_id) or (
+        [],
+        set(),
+        {},
+    )
+
+    # Channel selection
+    channels = channels or []
+    if channels:
+        channel = st.selectbox("Channels", channels, key=f"{model_key}_select_channels")
+    else:
+        channel = ""
+        st.warning("Channels not found")
+
+    # ResourceItem selection
+    resources = resources or []
+    if resources:
+        resource = st.selectbox(
+            "ResourceItem", resources, key=f"{model_key}_select_resources"
+        )
+    else:
+        resource = ""
+        st.warning("Resources not found")
+
+    # group and user selection
+    if not group_names:
+        st.warning("Groups not found")
+
+    if entities:
+        user_id = st.selectbox(
+            "Entity", entities, key=f"{model_key}_select_groups_and_users"
+        )
+    else:
+        user_id = ""
+        st.warning("Groups and Users not found")
+
+    access = st.selectbox("Access", ["allow", "deny"], key=f"{model_key}_select_access")
+
+    # Submit handler
+    if st.button("Add Permission", key=f"{model_key}_btn_add_permission"):
+
+        # check if permission is valid before trying to create permission;
+        # get_access covers a single resource, and st.cache_data cannot be
+        # probed without fetching the whole export on a miss
+        result_ = call_api(
+            endpoint="action/walker/access_control_action/get_access",
+            json_data={
+                "agent_id": agent_id,
+                "channel": channel,
+                "resource": resource,
+            },
+        )
+
+        granted_by_type = None
+        if (
+            result_
+            and result_.status_code == 200
+            and (result := get_reports_payload(result_))
+        ):
+            granted_by_type = {
+                access_type: [
+                    item["context"].get("user_id") or item["context"]["name"]
+                    for item in result.get(access_type, [])
+                ]
+                for access_type in ("allow", "deny")
+            }
+
+        conflict = None
+        if granted_by_type:
+            granted, members = _index_granted(granted_by_type, groups_result)
+
+            if user_id in members["allow"]:
+                conflict = (
+                    "User is in a GROUP that already has ALLOW access to this resource"
+                )
+            elif user_id in members["deny"]:
+                conflict = (
+                    "User is in a GROUP that already has DENY access to this resource"
+                )
+            elif user_id in granted["allow"]:
+                conflict = "User already has ALLOW access to this resource"
+            elif user_id in granted["deny"]:
+                conflict = "User already has DENY access to this resource"
+
+        if conflict:
+            st.error(conflict)
+        else:
+            access_result = call_api(
+                endpoint="action/walker/access_control_action/add_permission",
+                json_data={
+                    "agent_id": agent_id,
+                    "channel": channel,
+                    "resource": resource,
+                    "allow": access == "allow",
+                    "entity": user_id,
+                    "is_group": user_id in group_names,
+                },
+            )
+
+            if access_result and access_result.status_code == 200:
+                # a new permission may create its channel, resource, user or
+                # group, so every cached read is dropped
+                _bump_cache()
+                st.toast("Update successfully", icon="✅")
+                st.rerun()
+            else:
+                st.toast("Failed to update permissions", icon="⚠️")
+
+
+@st.fragment
+def _permissions_fragment(agent_id: str, model_key: str) -> None:
+    """
+    Render the permissions table.
+
+    Args:
+        agent_id (str): The agent ID.
+        model_key (str): The model key used to namespace widget keys.
+    """
+    # expanders run their body even when collapsed, so the table is only
+    # fetched and built once the user asks for it
+    toggle_col, refresh_col = st.columns([6, 1])
+    with toggle_col:
+        if not st.toggle("Show permissions", key=f"{model_key}_toggle_permissions"):
+            return
+    with refresh_col:
+        # other sessions may have changed the permissions within the cache ttl,
+        # so everything the table reads is dropped, filter options included
+        if st.button(
+            "Refresh",
+            key=f"{model_key}_btn_refresh_permissions",
+            use_container_width=True,
+        ):
+            _bump_cache(_fetch_resources, _fetch_permission_page)
+
+    # Display header
+    st.subheader("Permissions")
+
+    # Create filter columns - safely handle empty states
+    cols = st.columns([1, 1, 1])
+
+    with cols[0]:
+        resource_options = _read(_fetch_resources, agent_id) or []
+
+        resource_filter = st.multiselect(
+            "ResourceItem:",
+            options=resource_options,
+            default=[],
+            disabled=len(resource_options) == 0,
+        )
+
+    with cols[1]:
+        user_filter = st.text_input("User ID contains:")
+
+    with cols[2]:
+        permission_filter = st.selectbox(
+            "Permission:", options=["All", "Allow", "Deny"]
+        )
+
+    # the filters are applied by the walker, so only matching rows of the
+    # current page are transferred
+    query = (
+        tuple(resource_filter),
+        user_filter,
+        "" if permission_filter == "All" else permission_filter,
+    )
+
+    # the page widget is rendered once the total is known so it can be
+    # bounded by the page count
+    page_size_col, page_col, _ = st.columns([1, 1, 2])
+    with page_size_col:
+        page_size = st.selectbox(
+            "Rows per page",
+            _PAGE_SIZES,
+            index=1,
+            key=f"{model_key}_permissions_page_size",
+        )
+
+    page_key = f"{model_key}_permissions_page"
+    query_key = f"{model_key}_permissions_query"
+    if st.session_state.get(query_key) != (query, page_size):
+        # a new filter or page size starts over from the first page
+        st.session_state[query_key] = (query, page_size)
+        st.session_state[page_key] = 1
+    page = st.session_state.get(page_key, 1)
+    page_payload = _read(
+        _fetch_permission_page, agent_id, page_size, (page - 1) * page_size, *query
+    )
+    if page_payload is None:
+        st.error("Failed to get permissions.")
+        return
+
+    total = page_payload.get("total", 0)
+    pages = max(1, -(-total // page_size))
+    if page > pages:
+        # the page fell off the end after deletions
+        page = st.session_state[page_key] = pages
+        page_payload = _read(
+            _fetch_permission_page, agent_id, page_size, (page - 1) * page_size, *query
+        )
+        if page_payload is None:
+            st.error("Failed to get permissions.")
+            return
+
+    with page_col:
+        st.number_input("Page", min_value=1, max_value=pages, step=1, key=page_key)
+
+    # the frame is rebuilt from the cached page on each rerun, so it is kept
+    # in a local rather than written back to session state
+    filtered_df = _build_permissions_df(page_payload.get("columns", {}))
+
+    # Render the table as a single editor, edits are held until applied
+    editor_version = st.session_state.setdefault(
+        f"{model_key}_permissions_editor_version", 0
+    )
+    # the editor tracks pending edits by row position, so each page and
+    # filter selection gets its own editor state rather than shifting edits
+    # onto whichever rows the new selection puts at those positions
+    filter_key = "|".join(
+        (*resource_filter, user_filter, permission_filter, str(page_size), str(page))
+    )
+    editable_df = filtered_df[
+        ["enabled", "channel", "resource", "entity", "permission"]
+    ].assign(delete=False)
+    edited_df = st.data_editor(
+        editable_df,
+        key=f"{model_key}_permissions_editor_{editor_version}_{filter_key}",
+        hide_index=True,
+        num_rows="fixed",
+        use_container_width=True,
+        disabled=["channel", "resource", "entity", "permission"],
+        column_config={
+            "enabled": st.column_config.CheckboxColumn("Enabled"),
+            "channel": "Channel",
+            "resource": "ResourceItem",
+            "entity": "Entity",
+            "permission": "Permission",
+            "delete": st.column_config.CheckboxColumn("Delete"),
+        },
+    )
+
+    # rows marked for deletion are deleted, other changed rows are toggled
+    deleted = edited_df["delete"].to_numpy()
+    toggled = (
+        edited_df["enabled"].to_numpy() != editable_df["enabled"].to_numpy()
+    ) & ~deleted
+
+    if st.button(
+        "Apply Changes",
+        key=f"{model_key}_btn_apply_permissions",
+        disabled=not (deleted.any() or toggled.any()),
+    ):
+        mutations = _mutation_records(
+            filtered_df[toggled],
+            "enable_access",
+            "user",
+            enabled=edited_df["enabled"].to_numpy()[toggled],
+        ) + _mutation_records(filtered_df[deleted], "delete_permission", "user_id")
+
+        # every change is applied by a single walker call, which reports the
+        # outcome of each mutation so one failure does not abort the rest
+        try:
+            results = get_reports_payload(
+                _call_walker(
+                    "apply_permissions_batch",
+                    {"agent_id": agent_id, "mutations": mutations},
+                )
+            )
+            if not (isinstance(results, list) and len(results) == len(mutations)):
+                # a disabled action reports nothing, so mutations without a
+                # reported outcome are counted as failed
+                results = [False] * len(mutations)
+        except _WalkerError as error:
+            if error.status_code != 404:
+                # the batch may have been partly applied, so it is not
+                # replayed; every mutation is reported as failed
+                results = [False] * len(mutations)
+            else:
+                # agents on an older action lack the batch walker, so the
+                # mutations fall back to their own walkers, issued concurrently
+                results = _map_concurrently(
+                    lambda mutation: call_api(
+                        endpoint=f"action/walker/access_control_action/{mutation['op']}",
+                        json_data={
+                            "agent_id": agent_id,
+                            **{k: v for k, v in mutation.items() if k != "op"},
+                        },
+                    ),
+                    mutations,
+                )
+        failed = sum(1 for result in results if not result)
+
+        # start the next render from a fresh editor over the new data
+        st.session_state[f"{model_key}_permissions_editor_version"] += 1
+        _bump_cache(_fetch_permission_page)
+        if failed:
+            st.toast(f"Failed to apply {failed} permission change(s)", icon="⚠️")
+        else:
+            st.toast("Permissions updated successfully!", icon="✅")
+        _rerun_fragment()
+
+    # Show record count
+    st.caption(
+        f"Showing {len(filtered_df)} of {total} permissions (page {page} of {pages})"
+    )
+
+    # Handle empty state
+    if total == 0 and any(query):
+        st.warning("No permissions match your filters")
+    elif total == 0:
+        st.info("No permissions found")
+
 
 def render(router: StreamlitRouter, agent_id: str, action_id: str, info: dict) -> None:
     """
@@ -26,6 +1032,9 @@ def render(router: StreamlitRouter, agent_id: str, action_id: str, info: dict) -
     # add app header controls
     (model_key, module_root) = app_header(agent_id, action_id, info)
 
+    # warm the read caches in parallel so the sections below only hit memory
+    _prefetch(agent_id, _fetch_users, _fetch_groups, _fetch_channels, _fetch_resources)
+
     with st.expander("Access Control Configuration", expanded=False):
         # Add main app controls
         app_controls(agent_id, action_id, hidden=["session_groups", "permissions"])
@@ -38,21 +1047,28 @@ def render(router: StreamlitRouter, agent_id: str, action_id: str, info: dict) -
             key=f"{model_key}_btn_export_permissions",
             disabled=(not agent_id),
         ):
-            # Call the function to purge
-            if result := call_api(
-                endpoint="action/walker/access_control_action/export_permissions",
-                json_data={"agent_id": agent_id},
-            ):
+            # an explicit export always reads the current permissions
+            try:
+                report_result = get_reports_payload(
+                    _call_walker("export_permissions", {"agent_id": agent_id})
+                )
+            except _WalkerError:
+                report_result = None
+
+            if report_result:
                 st.success("Export permissions successfully")
-                if result and result.status_code == 200:
-                    report_result = get_reports_payload(result)
-                    st.download_button(
-                        label="Download Exported Permissions",
-                        data=json.dumps(report_result, indent=2),
-                        file_name="exported_permissions.json",
-                        mime="application/json",
-                    )
-                    st.json(report_result)
+                exported = _dump_json(report_result)
+                st.download_button(
+                    label="Download Exported Permissions",
+                    data=exported,
+                    file_name="exported_permissions.json",
+                    mime="application/json",
+                )
+                # only preview small exports, large ones are download only
+                if len(exported) < _EXPORT_PREVIEW_LIMIT:
+                    st.code(exported.decode("utf-8"), language="json")
+                else:
+                    st.caption(f"{len(exported)} bytes ready to download")
             else:
                 st.error(
                     "Failed to export permissions. Ensure that there is something to export"
@@ -67,7 +1083,7 @@ def render(router: StreamlitRouter, agent_id: str, action_id: str, info: dict) -
 
         raw_text_input = ""
         uploaded_file = None
-        data_to_import = None
+        data_to_import: object = None
 
         if permission_source == "Text input":
             raw_text_input = st.text_area(
@@ -95,26 +1111,36 @@ def render(router: StreamlitRouter, agent_id: str, action_id: str, info: dict) -
         ):
             try:
                 if permission_source == "Upload file" and uploaded_file:
-                    file_content = uploaded_file.read().decode("utf-8")
                     if uploaded_file.type == "application/json":
-                        data_to_import = json.loads(file_content)
+                        # orjson decodes the raw bytes without a str copy
+                        data_to_import = _load_json(uploaded_file.getvalue())
                     else:
-                        data_to_import = yaml.safe_load(file_content)
+                        # parse straight from the upload buffer instead of
+                        # materialising a decoded copy of the whole file
+                        uploaded_file.seek(0)
+                        with io.TextIOWrapper(
+                            uploaded_file, encoding="utf-8"
+                        ) as stream:
+                            data_to_import = _load_yaml(stream)
 
                 elif permission_source == "Text input" and raw_text_input.strip():
-                    # Try JSON first, fall back to YAML
-                    try:
-                        data_to_import = json.loads(raw_text_input)
-                    except json.JSONDecodeError:
-                        data_to_import = yaml.safe_load(raw_text_input)
+                    # Only try JSON when the text looks like it, otherwise YAML
+                    if raw_text_input.lstrip()[:1] in ("{", "["):
+                        try:
+                            data_to_import = _load_json(raw_text_input)
+                        except json.JSONDecodeError:
+                            data_to_import = _load_yaml(raw_text_input)
+                    else:
+                        data_to_import = _load_yaml(raw_text_input)
 
                 if data_to_import is None:
                     st.error("No valid permissions data provided.")
                 else:
-                    permissions = {}
+                    permissions: object = {}
                     session_groups = {}
                     if (
-                        "session_groups" in data_to_import
+                        isinstance(data_to_import, dict)
+                        and "session_groups" in data_to_import
                         and "permissions" in data_to_import
                     ):
                         permissions = data_to_import["permissions"]
@@ -132,6 +1158,7 @@ def render(router: StreamlitRouter, agent_id: str, action_id: str, info: dict) -
                         },
                     )
                     if result:
+                        _bump_cache()
                         st.success("Import permissions successfully")
                     else:
                         st.error(
@@ -141,652 +1168,13 @@ def render(router: StreamlitRouter, agent_id: str, action_id: str, info: dict) -
                 st.error(f"Import failed: {e}")
 
     with st.expander("Manage Users", False):
-        add_tab, users_tab = st.tabs(["Add Users", "Users"])
-
-        # add user tab
-        with add_tab:
-            # Create the text input - let Streamlit manage the state with the key
-            user_id = st.text_input("Enter User ID", key=f"{model_key}_input_user_id")
-
-            if st.button(
-                "Add User", key=f"{model_key}_btn_add_user", disabled=(not agent_id)
-            ):
-                if result := call_api(
-                    endpoint="action/walker/access_control_action/add_user",
-                    json_data={"agent_id": agent_id, "user_id": user_id},
-                ):
-                    st.success("User added successfully")
-                else:
-                    st.error("Failed to add user. Ensure that the user ID is correct")
-
-                time.sleep(2)
-                st.rerun()
-
-        # users tab
-        with users_tab:
-
-            st.markdown(
-                """
-            <style>
-                .slim-row {
-                    padding: 0.5rem 0;
-                    border-bottom: 1px solid #e0e0e0;
-                }
-                .slim-row:last-child {
-                    border-bottom: none;
-                }
-                .compact-button {
-                    padding: 0.2em 0.5em;
-                    font-size: 0.9em;
-                    height: auto !important;
-                }
-            </style>
-            """,
-                unsafe_allow_html=True,
-            )
-
-            if result := call_api(
-                endpoint="action/walker/access_control_action/get_users",
-                json_data={"agent_id": agent_id},
-            ):
-                result = get_reports_payload(result)
-                for user in result:
-                    # Create a container for each row with custom class
-                    with st.container():
-                        # Add custom class to the container
-                        st.markdown('<div class="slim-row">', unsafe_allow_html=True)
-
-                        user_id = user["context"]["user_id"]
-
-                        cols = st.columns([4, 1])
-                        with cols[0]:
-                            st.markdown(f"**{user_id}**")
-
-                        with cols[1]:
-                            if st.button(
-                                "Delete",
-                                key=f"{model_key}_{user_id}_btn_delete_user",
-                                disabled=(not agent_id),
-                                # Use compact button style
-                                use_container_width=True,
-                            ):
-                                if result := call_api(
-                                    endpoint="action/walker/access_control_action/delete_user",
-                                    json_data={
-                                        "agent_id": agent_id,
-                                        "user_id": user_id,
-                                    },
-                                ):
-                                    st.success(f"User {user_id} removed successfully")
-                                else:
-                                    st.error(f"Failed to remove user '{user_id}'")
-
-                                time.sleep(2)
-                                st.rerun()
-
-                        # Close the div
-                        st.markdown("</div>", unsafe_allow_html=True)
-            else:
-                st.error("Failed to get user.")
+        _users_fragment(agent_id, model_key)
 
     with st.expander("Manage Groups", False):
-        add_tab, add_session_group_tab, groups_tab = st.tabs(
-            ["Add Group", "Add User to Group", "Groups"]
-        )
-
-        with add_tab:
-            new_group = st.text_input("Enter Group", key=f"{model_key}_input_group")
-            if st.button("Add Group", key=f"{model_key}_btn_add_group"):
-                # Call the function to purge
-                if result := call_api(
-                    endpoint="action/walker/access_control_action/add_group",
-                    json_data={"agent_id": agent_id, "name": new_group},
-                ):
-                    st.success("Group added successfully")
-                else:
-                    st.error("Failed to add group. Ensure that the group is correct")
-
-                time.sleep(2)
-                st.rerun()
-
-        with add_session_group_tab:
-            groups_result = {}
-            groups_result_ = call_api(
-                endpoint="action/walker/access_control_action/get_groups",
-                json_data={"agent_id": agent_id, "include_users": True},
-            )
-            if groups_result_ and groups_result_.status_code == 200:
-                groups_result = get_reports_payload(groups_result_)
-
-            users_result_ = call_api(
-                endpoint="action/walker/access_control_action/get_users",
-                json_data={"agent_id": agent_id},
-            )
-            users = []
-            if users_result_ and users_result_.status_code == 200:
-                users = get_reports_payload(users_result_)
-            groups: list[Any] = []
-            if groups_result:
-                groups = list(groups_result.keys())
-
-            users = [user["context"]["user_id"] for user in users]
-            if not groups:
-                st.error("Failed to get groups.")
-
-            if not users:
-                st.error("Failed to get users.")
-
-            user_id = st.selectbox("Select User", users, key=f"{model_key}_select_user")
-            group = st.selectbox(
-                "Select Group", groups, key=f"{model_key}_select_group"
-            )
-
-            if st.button("Add User to Group", key=f"{model_key}_btn_add_session_group"):
-                # Call the function to purge
-                if result := call_api(
-                    endpoint="action/walker/access_control_action/add_session_group",
-                    json_data={
-                        "agent_id": agent_id,
-                        "user_id": user_id,
-                        "group": group,
-                    },
-                ):
-                    st.success("Group added successfully")
-                else:
-                    st.error("Failed to add group. Ensure that the group is correct")
-                time.sleep(2)
-                st.rerun()
-
-        with groups_tab:
-
-            for group_name in groups_result:
-                users = groups_result[group_name]
-                if group_name not in ["all", "any"]:
-
-                    # Group header row
-                    group_cols = st.columns([6, 1])
-                    with group_cols[0]:
-                        st.markdown(f"### {group_name}")
-                    with group_cols[1]:
-                        if st.button(
-                            "Delete Group",
-                            key=f"{model_key}_{group_name}_btn_delete_group",
-                            disabled=(not agent_id),
-                            use_container_width=True,
-                        ):
-                            result = call_api(
-                                endpoint="action/walker/access_control_action/delete_group",
-                                json_data={"agent_id": agent_id, "name": group_name},
-                            )
-                            if result:
-                                st.success(f"Group {group_name} removed successfully")
-                            else:
-                                st.error(f"Failed to remove group '{group_name}'")
-                            time.sleep(2)
-                            st.rerun()
-
-                    # Show users under group
-                    if users:
-                        for i, user in enumerate(users):
-                            # Alternate background color
-                            bg_color = "#1f1f23" if i % 2 == 0 else "#2a2a2f"
-                            text_color = "#817D7D"
-
-                            user_cols = st.columns([6, 1])
-                            with user_cols[0]:
-                                st.markdown(
-                                    f"""
-                                    <div style="padding: 10px 14px;
-                                                background-color: {bg_color};
-                                                border-radius: 8px;
-                                                margin-bottom: 6px;
-                                                border: 1px solid #3c3c3c;">
-                                        <strong style="color: {text_color}; font-size: 15px;">{user}</strong>
-                                    </div>
-                                    """,
-                                    unsafe_allow_html=True,
-                                )
-
-                            with user_cols[1]:
-                                if st.button(
-                                    "Remove User",
-                                    key=f"del_user_{group_name}_{user}",
-                                    use_container_width=True,
-                                    help=f"Remove {user} from {group_name}",
-                                ):
-                                    result = call_api(
-                                        endpoint="action/walker/access_control_action/remove_user",
-                                        json_data={
-                                            "agent_id": agent_id,
-                                            "group": group_name,
-                                            "user_id": user,
-                                        },
-                                    )
-
-                                    if result:
-                                        st.success(
-                                            f"User '{user}' removed from '{group_name}'"
-                                        )
-
-                                        with suppress(Exception):
-                                            st.experimental_rerun()
-                                    else:
-                                        st.error(
-                                            f"Failed to remove user '{user}' from '{group_name}'"
-                                        )
-
-                                    time.sleep(2)
-                                    st.rerun()
-                    else:
-                        st.info("No users in this group.")
-            st.markdown("\n")
+        _groups_fragment(agent_id, model_key)
 
     with st.expander("Manage Permissions", expanded=False):
-        st.subheader("Add Permissions")
-        # Channel selection
-        channels = []
-        channels_result_ = call_api(
-            endpoint="action/walker/access_control_action/get_channels",
-            json_data={"agent_id": agent_id},
-        )
-
-        if channels_result_ and channels_result_.status_code == 200:
-            channels = get_reports_payload(channels_result_)
-
-        if channels:
-            channel = st.selectbox(
-                "Channels", channels, key=f"{model_key}_select_channels"
-            )
-        else:
-            channel = ""
-            st.warning("Channels not found")
-
-        # ResourceItem selection
-        resources = []
-        resources_result_ = call_api(
-            endpoint="action/walker/access_control_action/get_resources",
-            json_data={"agent_id": agent_id},
-        )
-        if resources_result_ and resources_result_.status_code == 200:
-            resources = get_reports_payload(resources_result_)
-
-        if resources:
-            resource = st.selectbox(
-                "ResourceItem", resources, key=f"{model_key}_select_resources"
-            )
-        else:
-            resource = ""
-            st.warning("Resources not found")
-
-        # group selection
-        groups_result = {}
-        groups_result_ = call_api(
-            endpoint="action/walker/access_control_action/get_groups",
-            json_data={"agent_id": agent_id, "include_users": True},
-        )
-        if groups_result_ and groups_result_.status_code == 200:
-            groups_result = get_reports_payload(groups_result_)
-
-        if groups_result:
-            groups = list(groups_result.keys())
-        else:
-            groups = []
-            st.warning("Groups not found")
-
-        # user selection
-        users = []
-        users_result_ = call_api(
-            endpoint="action/walker/access_control_action/get_users",
-            json_data={"agent_id": agent_id},
-        )
-        if users_result_ and users_result_.status_code == 200:
-            users = get_reports_payload(users_result_)
-
-        if users:
-            users_ids = [user["context"]["user_id"] for user in users]
-            groups.extend(users_ids)
-
-        if groups:
-            user_id = st.selectbox(
-                "Entity", groups, key=f"{model_key}_select_groups_and_users"
-            )
-        else:
-            user_id = ""
-            st.warning("Groups and Users not found")
-
-        access = st.selectbox(
-            "Access", ["allow", "deny"], key=f"{model_key}_select_access"
-        )
-
-        # Submit handler
-        if st.button("Add Permission", key=f"{model_key}_btn_add_permission"):
-
-            # check if permission is valid before trying to create permission
-            result_ = call_api(
-                endpoint="action/walker/access_control_action/get_access",
-                json_data={
-                    "agent_id": agent_id,
-                    "channel": channel,
-                    "resource": resource,
-                },
-            )
-
-            if result_ and result_.status_code == 200:
-                result = get_reports_payload(result_)
-
-            if result:
-                allow_list = result.get("allow", [])
-                deny_list = result.get("deny", [])
-
-                allow_list_formatted = []
-                deny_list_formatted = []
-                allow_group = []
-                deny_group = []
-
-                for item in allow_list:
-                    if "user_id" in item["context"]:
-                        allow_list_formatted.append(item["context"]["user_id"])
-                    else:
-                        allow_list_formatted.append(item["context"]["name"])
-                        # append group user to allow list
-                        if item["context"]["name"] in groups_result:
-                            allow_group.extend(groups_result[item["context"]["name"]])
-
-                for item in deny_list:
-                    if "user_id" in item["context"]:
-                        deny_list_formatted.append(item["context"]["user_id"])
-                    else:
-                        deny_list_formatted.append(item["context"]["name"])
-                        # append group user to deny list
-                        if item["context"]["name"] in groups_result:
-                            deny_group.extend(groups_result[item["context"]["name"]])
-
-                if user_id in deny_group:
-                    st.error(
-                        "User is in a GROUP that already has ALLOW access to this resource"
-                    )
-                elif user_id in allow_group:
-                    st.error(
-                        "User is in a GROUP that already has DENY access to this resource"
-                    )
-                elif user_id in allow_list_formatted:
-                    st.error("User already has ALLOW access to this resource")
-                elif user_id in deny_list_formatted:
-                    st.error("User already has DENY access to this resource")
-                else:
-                    access_result = call_api(
-                        endpoint="action/walker/access_control_action/add_permission",
-                        json_data={
-                            "agent_id": agent_id,
-                            "channel": channel,
-                            "resource": resource,
-                            "allow": access == "allow",
-                            "entity": user_id,
-                            "is_group": user_id in groups_result,
-                        },
-                    )
-
-                    if access_result:
-                        st.success("Update successfully")
-                    else:
-                        st.error("Failed to update permissions")
-
-                    time.sleep(2)
-                    st.rerun()
-
-            else:
-                access_result = call_api(
-                    endpoint="action/walker/access_control_action/add_permission",
-                    json_data={
-                        "agent_id": agent_id,
-                        "channel": channel,
-                        "resource": resource,
-                        "allow": access == "allow",
-                        "entity": user_id,
-                        "is_group": user_id in groups_result,
-                    },
-                )
-
-                if access_result and access_result.status_code == 200:
-                    st.success("Update successfully")
-                else:
-                    st.error("Failed to update permissions")
-
-    with st.expander("Permissions", True):
-        # Initialize and fetch permissions
-        if permissions := call_api(
-            endpoint="action/walker/access_control_action/export_permissions",
-            json_data={"agent_id": agent_id},
-        ):
-            permissions = permissions.json()
-            permissions = permissions.get("reports", [{}])[0]
-
-            # Process permissions data
-            formatted_permissions: list[dict] = []  # If storing dictionaries
-            permissions = permissions.get("permissions", {})
-
-            for channel, resources in permissions.items():
-                if isinstance(resources, dict):
-                    for resource, access in resources.items():
-                        allow_list = access.get("allow", [])
-                        deny_list = access.get("deny", [])
-
-                        for user in allow_list:
-                            formatted_permissions.append(
-                                {
-                                    "enabled": user.get("enabled", False),
-                                    "channel": channel,
-                                    "resource": resource,
-                                    "permission": "Allow",
-                                    "entity": user.get("group")
-                                    or user.get("user", "Unknown"),
-                                    "type": "group" if user.get("group") else "user",
-                                }
-                            )
-
-                        for user in deny_list:
-                            formatted_permissions.append(
-                                {
-                                    "enabled": user.get("enabled", False),
-                                    "channel": channel,
-                                    "resource": resource,
-                                    "permission": "Deny",
-                                    "entity": user.get("group")
-                                    or user.get("user", "Unknown"),
-                                    "type": "group" if user.get("group") else "user",
-                                }
-                            )
-
-            # Initialize session state with proper column handling
-            columns = ["enabled", "channel", "resource", "permission", "entity", "type"]
-            # Create empty DataFrame with all columns if no permissions exist
-            st.session_state.df_permissions = pd.DataFrame(
-                formatted_permissions if formatted_permissions else [], columns=columns
-            )
-
-            # Ensure all columns exist in session state
-            required_columns = [
-                "enabled",
-                "channel",
-                "resource",
-                "permission",
-                "entity",
-            ]
-            for col in required_columns:
-                if col not in st.session_state.df_permissions:
-                    st.session_state.df_permissions[col] = (
-                        False if col == "enabled" else ""
-                    )
-
-            # Display header
-            st.subheader("Permissions")
-
-            # Create filter columns - safely handle empty states
-            cols = st.columns([1, 1, 1])
-
-            with cols[0]:
-                # # Safely get resource options
-                resource_options = []
-                if "resource" in st.session_state.df_permissions:
-                    resource_options = (
-                        st.session_state.df_permissions["resource"].unique().tolist()
-                    )
-
-                resource_filter = st.multiselect(
-                    "ResourceItem:",
-                    options=resource_options,
-                    default=[],
-                    disabled=len(resource_options) == 0,
-                )
-
-            with cols[1]:
-                user_filter = st.text_input("User ID contains:")
-
-            with cols[2]:
-                permission_filter = st.selectbox(
-                    "Permission:", options=["All", "Allow", "Deny"]
-                )
-
-            # Apply filters safely
-            filtered_df = st.session_state.df_permissions.copy()
-
-            if resource_filter and "resource" in filtered_df:
-                filtered_df = filtered_df[filtered_df["resource"].isin(resource_filter)]
-
-            if user_filter and "entity" in filtered_df:
-                filtered_df = filtered_df[
-                    filtered_df["entity"].str.contains(
-                        user_filter, case=False, na=False
-                    )
-                ]
-
-            if permission_filter != "All" and "permission" in filtered_df:
-                filtered_df = filtered_df[
-                    filtered_df["permission"] == permission_filter
-                ]
-
-            # Display table header
-            if not filtered_df.empty:
-                header_cols = st.columns([0.54, 0.6, 1.43, 0.9, 0.8, 0.5, 0.01])
-                header_labels = [
-                    "Enabled",
-                    "Channel",
-                    "ResourceItem",
-                    "Entity",
-                    "Permission",
-                    "Delete",
-                ]
-
-                for i, label in enumerate(header_labels):
-                    with header_cols[i]:
-                        st.write(f"**{label}**")
-
-            if "checkbox_states" not in st.session_state:
-                st.session_state.checkbox_states = {}
-
-            # Create form for each row
-            for idx, row in filtered_df.iterrows():
-                row_key = f"row_{idx}"
-                with st.form(key=row_key):
-                    cols = st.columns([0.5, 0.7, 1.5, 1, 0.8, 0.5])
-
-                    # Enabled checkbox
-                    with cols[0]:
-                        # button_text = "Enable ✅" if row['enabled'] else "Disable ⛔"
-                        button_text = "✅" if row["enabled"] else "⛔"
-                        enable_submitted = st.form_submit_button(
-                            button_text, use_container_width=True
-                        )
-
-                    # Display row data with fallbacks
-                    with cols[1]:
-                        st.write(row.get("channel", "N/A"))
-                    with cols[2]:
-                        st.write(row.get("resource", "N/A"))
-                    with cols[3]:
-                        st.write(row.get("entity", "Unknown"))
-                    with cols[4]:
-                        st.write(row.get("permission", "N/A"))
-
-                    # Delete button
-                    with cols[5]:
-                        delete_submitted = st.form_submit_button(
-                            "🗑️", use_container_width=True
-                        )
-
-                    # Submit button for the form
-                    if enable_submitted:
-
-                        if row.get("type") == "group":
-                            payload = {
-                                "agent_id": agent_id,
-                                "enabled": not bool(row.get("enabled")),
-                                "channel": row.get("channel", ""),
-                                "resource": row.get("resource", ""),
-                                "group": row.get("entity", ""),
-                                "user": "",
-                            }
-                        else:
-                            payload = {
-                                "agent_id": agent_id,
-                                "enabled": not bool(row.get("enabled")),
-                                "channel": row.get("channel", ""),
-                                "resource": row.get("resource", ""),
-                                "user": row.get("entity", ""),
-                                "group": "",
-                            }
-
-                        if call_api(
-                            endpoint="action/walker/access_control_action/enable_access",
-                            json_data=payload,
-                        ):
-                            st.success("Updated successfully!")
-                            time.sleep(2)
-                            st.rerun()
-                        else:
-                            st.error("Failed to update permission")
-
-                    # Handle actions
-                    if delete_submitted:
-
-                        if row.get("type") == "group":
-                            payload = {
-                                "agent_id": agent_id,
-                                "channel": row.get("channel", ""),
-                                "resource": row.get("resource", ""),
-                                "user_id": "",
-                                "group": row.get("entity", ""),
-                            }
-                        else:
-                            payload = {
-                                "agent_id": agent_id,
-                                "channel": row.get("channel", ""),
-                                "resource": row.get("resource", ""),
-                                "user_id": row.get("entity", ""),
-                                "group": "",
-                            }
-
-                        if call_api(
-                            endpoint="action/walker/access_control_action/delete_permission",
-                            json_data=payload,
-                        ):
-
-                            st.session_state.df_permissions = (
-                                st.session_state.df_permissions.drop(idx)
-                            )
-                            st.success("Permission successfully removed!")
-                            time.sleep(2)
-                            st.rerun()
-                        else:
-                            st.error("Failed to delete permission")
-
-            # Show record count
-            st.caption(
-                f"Showing {len(filtered_df)} of {len(st.session_state.df_permissions)} permissions"
-            )
+        _manage_permissions_fragment(agent_id, model_key)
 
-            # Handle empty state
-            if st.session_state.df_permissions.empty:
-                st.info("No permissions found")
-            elif filtered_df.empty:
-                st.warning("No permissions match your filters")
+    with st.expander("Permissions", False):
+        _permissions_fragment(agent_id, model_key)
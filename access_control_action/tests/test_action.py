@@ -1,39 +1,259 @@
 """Tests for AccessControlAction."""
 
 import os
+from types import SimpleNamespace
+from typing import Iterator, Protocol
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def jac_module() -> Iterator[tuple]:
+    """Load the JAC application once for every test in this module."""
+
+    from jaclang import jac_import
+    from jaclang.runtimelib.context import ExecutionContext
+
+    filename = os.path.abspath(
+        os.path.join(
+            os.path.dirname(__file__),
+            "..",
+            "access_control_action.jac",
+        )
+    )
+
+    base, mod = os.path.split(filename)
+    mod = mod[:-4]
+
+    # a path derived from this file keeps the compiled module cache in one
+    # place however the tests are invoked
+    os.environ["JACPATH"] = base
+
+    # load the JAC application
+    jctx = ExecutionContext.create()
+
+    module = jac_import(
+        target=mod,
+        base_path=base,
+        cachable=True,
+        override_name="__main__",
+    )
+
+    yield module
+
+    jctx.close()
+
+    del os.environ["JACPATH"]
+
+
+class _Action(Protocol):
+    """The AccessControlAction methods exercised by these tests."""
+
+    def apply_permissions_batch(self, mutations: list) -> list:
+        """Apply a batch of permission mutations."""
+
+    def list_permissions(
+        self,
+        limit: int = 0,
+        offset: int = 0,
+        resources: list | None = None,
+        entity_contains: str = "",
+        permission: str = "",
+    ) -> dict:
+        """List a page of the flattened permissions."""
+
+
+PERMISSIONS = {
+    "default": {
+        "any": {
+            "allow": [
+                {"group": "admins", "enabled": True},
+                {"user": "alice", "enabled": True},
+            ],
+            "deny": [{"user": "bob", "enabled": False}],
+        },
+        "chat": {
+            "allow": [{"user": "Alicia", "enabled": True}],
+            "deny": [],
+        },
+    },
+    "whatsapp": {
+        "any": {
+            "allow": [],
+            "deny": [{"group": "guests", "enabled": True}],
+        },
+    },
+}
+
+
+@pytest.fixture
+def action(jac_module: tuple) -> _Action:
+    """Create an AccessControlAction node outside of an agent graph."""
+
+    return jac_module[0].AccessControlAction()
+
+
+@pytest.fixture
+def exported_action(action: _Action, monkeypatch: pytest.MonkeyPatch) -> _Action:
+    """Create an AccessControlAction node exporting PERMISSIONS."""
+
+    monkeypatch.setattr(
+        action,
+        "export_permissions",
+        lambda: SimpleNamespace(permissions=PERMISSIONS),
+    )
+    return action
 
 
 class TestAccessControlAction:
     """Tests for AccessControlAction."""
 
-    def test_access_control_action(self) -> None:
+    def test_access_control_action(self, jac_module: tuple) -> None:
         """Test AccessControlAction."""
 
-        from jaclang import jac_import
-        from jaclang.runtimelib.context import ExecutionContext
+        assert hasattr(jac_module[0], "AccessControlAction")
 
-        os.environ["JACPATH"] = "./"
+    def test_apply_permissions_batch(
+        self, action: _Action, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that each mutation is applied and reported in order."""
 
-        # load the JAC application
-        jctx = ExecutionContext.create()
+        applied = []
 
-        filename = os.path.join(
-            os.path.dirname(__file__),
-            "..",
-            "access_control_action.jac",
+        def enable_access(**kwargs: object) -> bool:
+            applied.append(("enable_access", kwargs))
+            return True
+
+        def delete_permission(**kwargs: object) -> bool:
+            applied.append(("delete_permission", kwargs))
+            return kwargs["user_id"] == "u2"
+
+        monkeypatch.setattr(action, "enable_access", enable_access)
+        monkeypatch.setattr(action, "delete_permission", delete_permission)
+
+        results = action.apply_permissions_batch(
+            mutations=[
+                {
+                    "op": "enable_access",
+                    "user": "u1",
+                    "group": "",
+                    "channel": "default",
+                    "resource": "any",
+                    "enabled": False,
+                },
+                {
+                    "op": "delete_permission",
+                    "user_id": "u2",
+                    "group": "",
+                    "channel": "default",
+                    "resource": "any",
+                },
+                {
+                    "op": "delete_permission",
+                    "user_id": "u3",
+                    "group": "",
+                    "channel": "default",
+                    "resource": "any",
+                },
+            ]
         )
 
-        base, mod = os.path.split(filename)
-        base = base if base else "./"
-        mod = mod[:-4]
+        assert results == [True, True, False]
+        assert [op for op, _ in applied] == [
+            "enable_access",
+            "delete_permission",
+            "delete_permission",
+        ]
+        assert applied[0][1]["enabled"] is False
 
-        jac_import(
-            target=mod,
-            base_path=base,
-            cachable=True,
-            override_name="__main__",
+    def test_apply_permissions_batch_isolates_failures(
+        self, action: _Action, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        """Test that a failing or unknown mutation does not abort the rest."""
+
+        def enable_access(**kwargs: object) -> bool:
+            if kwargs["user"] == "broken":
+                raise RuntimeError("enable_access failed")
+            return True
+
+        monkeypatch.setattr(action, "enable_access", enable_access)
+
+        results = action.apply_permissions_batch(
+            mutations=[
+                {"op": "enable_access", "user": "broken", "enabled": True},
+                {"op": "rename_permission", "user": "u1"},
+                {"user": "u1"},
+                {"op": "enable_access", "user": "u1", "enabled": True},
+            ]
         )
 
-        jctx.close()
+        assert results == [False, False, False, True]
+
+    def test_apply_permissions_batch_empty(self, action: _Action) -> None:
+        """Test that an empty batch reports no results."""
+
+        assert action.apply_permissions_batch(mutations=[]) == []
+
+    def test_list_permissions_page(self, exported_action: _Action) -> None:
+        """Test that offset and limit slice the flattened rows."""
+
+        page = exported_action.list_permissions(limit=2, offset=1)
+
+        assert page["total"] == 5
+        assert page["columns"] == {
+            "enabled": [True, False],
+            "channel": ["default", "default"],
+            "resource": ["any", "any"],
+            "permission": ["Allow", "Deny"],
+            "entity": ["alice", "bob"],
+            "type": ["user", "user"],
+        }
+
+        last_page = exported_action.list_permissions(limit=2, offset=4)
+
+        assert last_page["total"] == 5
+        assert last_page["columns"]["entity"] == ["guests"]
+        assert last_page["columns"]["type"] == ["group"]
+
+    def test_list_permissions_without_limit(self, exported_action: _Action) -> None:
+        """Test that a limit of 0 returns every row from the offset."""
+
+        page = exported_action.list_permissions(limit=0)
+
+        assert page["total"] == 5
+        assert page["columns"]["entity"] == [
+            "admins",
+            "alice",
+            "bob",
+            "Alicia",
+            "guests",
+        ]
+        assert exported_action.list_permissions(limit=0, offset=3)["columns"][
+            "entity"
+        ] == ["Alicia", "guests"]
+
+    def test_list_permissions_filters(self, exported_action: _Action) -> None:
+        """Test that the resource, entity and permission filters are applied."""
+
+        by_resource = exported_action.list_permissions(resources=["chat"])
+        assert by_resource["total"] == 1
+        assert by_resource["columns"]["entity"] == ["Alicia"]
+
+        by_entity = exported_action.list_permissions(entity_contains="ALI")
+        assert by_entity["total"] == 2
+        assert by_entity["columns"]["entity"] == ["alice", "Alicia"]
+
+        by_permission = exported_action.list_permissions(permission="Deny")
+        assert by_permission["total"] == 2
+        assert by_permission["columns"]["entity"] == ["bob", "guests"]
+
+        combined = exported_action.list_permissions(
+            resources=["any"], entity_contains="b", permission="Deny"
+        )
+        assert combined["total"] == 1
+        assert combined["columns"]["channel"] == ["default"]
+        assert combined["columns"]["entity"] == ["bob"]
 
-        del os.environ["JACPATH"]
+        none = exported_action.list_permissions(entity_contains="nobody")
+        assert none["total"] == 0
+        assert none["columns"]["entity"] == []